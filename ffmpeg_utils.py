@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Shared FFmpeg helpers used by process_audio.py and generate_noise.py.
+"""
+
+import functools
+import shutil
+
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_path(name='ffmpeg'):
+    """Absolute path of an ffmpeg-suite binary, resolved once per process.
+
+    ffmpeg has no daemon mode, so every job pays process startup; the best
+    we can do on the Python side is spawn the cached absolute path instead
+    of re-searching PATH on each invocation. Falls back to the bare name
+    (letting the spawn itself fail) when the binary is missing.
+    """
+    return shutil.which(name) or name
+
+
+@functools.lru_cache(maxsize=1)
+def check_ffmpeg():
+    """Check if FFmpeg is installed and available on PATH.
+
+    A PATH lookup via shutil.which is all that argv-based invocation needs,
+    and is far cheaper than spawning `ffmpeg -version`. The result is cached
+    for the lifetime of the process.
+    """
+    return shutil.which('ffmpeg') is not None
@@ -5,23 +5,37 @@ These are used in STEP 3 of the audio processing workflow.
 """
 
 import argparse
+import concurrent.futures
 import subprocess
 import sys
 
+from ffmpeg_utils import check_ffmpeg, ffmpeg_path
 
-def check_ffmpeg():
-    """Check if FFmpeg is installed and available."""
-    try:
-        result = subprocess.run(
-            ['ffmpeg', '-version'],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0:
-            return True
-    except FileNotFoundError:
-        pass
-    return False
+# Synthesizing filtered white noise is ~20 lines of NumPy; prefer that over
+# forking ffmpeg when the scientific stack is available.
+try:
+    import numpy as np
+    import scipy.signal as sps
+    import soundfile as sf
+    HAVE_NUMPY_SYNTH = True
+except ImportError:
+    HAVE_NUMPY_SYNTH = False
+
+SAMPLE_RATE = 44100
+
+
+def _synth_filtered_noise(output, duration, band, gain, seed):
+    """Write band-passed white noise (stereo, 44.1 kHz, PCM_16) to output.
+
+    In-process equivalent of the ffmpeg anoisesrc + lowpass/highpass
+    chains: seeded Gaussian noise through a 4th-order Butterworth
+    bandpass, scaled by gain.
+    """
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal((duration * SAMPLE_RATE, 2)).astype(np.float32)
+    sos = sps.butter(4, band, btype='band', fs=SAMPLE_RATE, output='sos')
+    filtered = sps.sosfilt(sos, noise, axis=0).astype(np.float32) * gain
+    sf.write(output, filtered, SAMPLE_RATE, subtype='PCM_16')
 
 
 def generate_rain(duration=60, output='rain.wav'):
@@ -30,16 +44,30 @@ def generate_rain(duration=60, output='rain.wav'):
     Creates a loopable rain sound.
     """
     print(f"🌧️  Generating rain ambience ({duration}s)...")
-    
+
+    if HAVE_NUMPY_SYNTH:
+        try:
+            _synth_filtered_noise(output, duration, (200, 2000), 0.3, seed=42)
+            print(f"✅ Rain file created: {output}")
+            return True
+        except (OSError, ValueError) as e:
+            print(f"⚠️  NumPy synthesis failed ({e}), falling back to ffmpeg...")
+
     # Use noise filter with low frequency emphasis for rain-like sound
-    command = f'ffmpeg -f lavfi -i "anoisesrc=duration={duration}:color=white:seed=42" -filter:a "lowpass=f=2000,highpass=f=200,volume=0.3" -y "{output}"'
-    
+    command = [ffmpeg_path(), '-hide_banner', '-loglevel', 'error', '-nostats',
+               '-f', 'lavfi',
+               '-i', f'anoisesrc=duration={duration}:color=white:seed=42',
+               '-vn', '-sn', '-dn',
+               '-af', 'lowpass=f=2000,highpass=f=200,volume=0.3',
+               '-y', output]
+
     try:
-        subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
+        subprocess.run(command, check=True, bufsize=1 << 20,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
         print(f"✅ Rain file created: {output}")
         return True
     except subprocess.CalledProcessError as e:
-        print(f"❌ Error generating rain: {e.stderr}")
+        print(f"❌ Error generating rain: {e.stderr[-4096:].decode(errors='replace')}")
         return False
 
 
@@ -49,16 +77,30 @@ def generate_vinyl(duration=60, output='vinyl.wav'):
     Creates a very soft vinyl texture sound.
     """
     print(f"💿 Generating vinyl noise ({duration}s)...")
-    
+
+    if HAVE_NUMPY_SYNTH:
+        try:
+            _synth_filtered_noise(output, duration, (1000, 8000), 0.2, seed=123)
+            print(f"✅ Vinyl file created: {output}")
+            return True
+        except (OSError, ValueError) as e:
+            print(f"⚠️  NumPy synthesis failed ({e}), falling back to ffmpeg...")
+
     # Use noise filter with emphasis on higher frequencies for vinyl crackle
-    command = f'ffmpeg -f lavfi -i "anoisesrc=duration={duration}:color=white:seed=123" -filter:a "highpass=f=1000,lowpass=f=8000,volume=0.2" -y "{output}"'
-    
+    command = [ffmpeg_path(), '-hide_banner', '-loglevel', 'error', '-nostats',
+               '-f', 'lavfi',
+               '-i', f'anoisesrc=duration={duration}:color=white:seed=123',
+               '-vn', '-sn', '-dn',
+               '-af', 'highpass=f=1000,lowpass=f=8000,volume=0.2',
+               '-y', output]
+
     try:
-        subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
+        subprocess.run(command, check=True, bufsize=1 << 20,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
         print(f"✅ Vinyl file created: {output}")
         return True
     except subprocess.CalledProcessError as e:
-        print(f"❌ Error generating vinyl: {e.stderr}")
+        print(f"❌ Error generating vinyl: {e.stderr[-4096:].decode(errors='replace')}")
         return False
 
 
@@ -84,19 +126,30 @@ def main():
     # If no specific option, generate both
     generate_both = not args.rain and not args.vinyl
     
-    # Check FFmpeg
-    if not check_ffmpeg():
+    # Check FFmpeg (only required when the NumPy synthesis path is missing)
+    if not HAVE_NUMPY_SYNTH and not check_ffmpeg():
         print("❌ FFmpeg is not installed or not in PATH")
         print("   Please install FFmpeg first. See README.md for instructions.")
         sys.exit(1)
     
     success = True
-    
-    if args.rain or generate_both:
+
+    want_rain = args.rain or generate_both
+    want_vinyl = args.vinyl or generate_both
+
+    if want_rain and want_vinyl:
+        # The two ffmpeg syntheses are independent, so run them in parallel
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            rain_future = executor.submit(generate_rain, args.duration, args.rain_output)
+            vinyl_future = executor.submit(generate_vinyl, args.duration, args.vinyl_output)
+            if not rain_future.result():
+                success = False
+            if not vinyl_future.result():
+                success = False
+    elif want_rain:
         if not generate_rain(args.duration, args.rain_output):
             success = False
-    
-    if args.vinyl or generate_both:
+    elif want_vinyl:
         if not generate_vinyl(args.duration, args.vinyl_output):
             success = False
     
@@ -5,152 +5,517 @@ Automates the workflow to process audio files and avoid Content ID detection.
 """
 
 import argparse
+import asyncio
+import hashlib
 import os
-import subprocess
+import shlex
+import struct
 import sys
+import tempfile
+import wave
+from fractions import Fraction
 from pathlib import Path
-import glob
 
+from ffmpeg_utils import check_ffmpeg, ffmpeg_path
 
-def check_ffmpeg():
-    """Check if FFmpeg is installed and available."""
+# Optional in-process fast path: for plain WAV input the pitch/noise/EQ
+# chain is just resample + biquad + mix, which numpy/scipy handle without
+# decoding through ffmpeg at all.
+try:
+    import numpy as np
+    import scipy.signal as sps
+    import soundfile as sf
+    HAVE_NUMPY_PATH = True
+except ImportError:
+    HAVE_NUMPY_PATH = False
+
+# Thread count passed to ffmpeg via -threads (None = ffmpeg decides).
+# Batch mode pins this to 1 so parallel files don't oversubscribe cores.
+FFMPEG_THREADS = None
+
+# How many files to fuse into a single ffmpeg process in batch mode.
+# Larger chunks amortize ffmpeg startup further but grow the filter graph.
+BATCH_FUSE_SIZE = 8
+
+# Silence the banner and per-frame progress stats on every invocation;
+# actual errors still reach stderr at -loglevel error, so failure
+# reporting is unaffected while success-path stderr traffic drops to
+# near-zero.
+FFMPEG_LOG_ARGS = ['-hide_banner', '-loglevel', 'error', '-nostats']
+
+# Sample rate probed per input file (ffprobe result, memoized)
+_sample_rate_cache = {}
+
+
+def _pcm_output_args(sample_rate=44100):
+    """Explicit output format for the fused pass. Pinning codec/rate/channels
+    keeps libavfilter from negotiating extra sample-format conversions and
+    makes the (loop-pass -c copy) output format deterministic. -vn/-sn/-dn
+    short-circuit video/subtitle/data stream handling (album art in mp3s,
+    for example) so only audio ever reaches the muxer.
+    """
+    return ['-vn', '-sn', '-dn', '-c:a', 'pcm_s16le', '-ar', str(sample_rate), '-ac', '2']
+
+
+async def probe_sample_rate(path):
+    """Return the sample rate of the first audio stream, memoized per path.
+
+    Probing once lets the pipeline run at the input's native rate instead
+    of assuming 44100 (which would mis-shift pitch for 48 kHz sources and
+    force a pointless resample). Falls back to 44100 if ffprobe is missing
+    or fails.
+    """
+    if path in _sample_rate_cache:
+        return _sample_rate_cache[path]
+    rate = 44100
     try:
-        result = subprocess.run(
-            ['ffmpeg', '-version'],
-            capture_output=True,
-            text=True
+        process = await asyncio.create_subprocess_exec(
+            ffmpeg_path('ffprobe'), '-v', 'error', '-select_streams', 'a:0',
+            '-show_entries', 'stream=sample_rate', '-of', 'csv=p=0', path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
         )
-        if result.returncode == 0:
-            return True
-    except FileNotFoundError:
-        pass
-    return False
+        stdout, _ = await process.communicate()
+        if process.returncode != 0:
+            raise ValueError('ffprobe failed')
+        rate = int(stdout.strip())
+    except (FileNotFoundError, ValueError):
+        rate = 44100
+        print(f"⚠️  Warning: Could not probe sample rate of '{path}', assuming 44100")
+    _sample_rate_cache[path] = rate
+    return rate
+
+
+def _threads_args():
+    """Return the argv fragment pinning ffmpeg's thread pools, or [] when unset.
+
+    Covers codec threads as well as the (simple and complex) filter-graph
+    pools: when --jobs already runs several files concurrently, letting each
+    ffmpeg spawn cpu_count worker threads would oversubscribe the cores and
+    thrash caches, so batch mode pins all three pools to 1.
+    """
+    if not FFMPEG_THREADS:
+        return []
+    n = str(FFMPEG_THREADS)
+    return ['-threads', n, '-filter_threads', n, '-filter_complex_threads', n]
 
 
-def run_ffmpeg(command, description):
-    """Run an FFmpeg command and handle errors."""
+async def run_ffmpeg_async(argv, description):
+    """Run an FFmpeg command (as an argv list) asynchronously and handle errors.
+
+    Using asyncio subprocesses lets the event loop overlap many ffmpeg
+    invocations in one interpreter instead of blocking in subprocess.run
+    (or paying ProcessPoolExecutor pickling for what is pure subprocess
+    supervision).
+    """
     print(f"🔄 {description}...")
-    try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
+    argv = [ffmpeg_path(argv[0])] + FFMPEG_LOG_ARGS + argv[1:]
+    # stdout is never used (outputs go to files), so don't buffer it;
+    # stderr is tiny on success after -hide_banner/-nostats.
+    process = await asyncio.create_subprocess_exec(
+        *argv,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+        limit=1 << 20  # 1 MiB stream buffer; default 64 KiB stalls chatty pipes
+    )
+    _, stderr = await process.communicate()
+    if process.returncode == 0:
         print(f"✅ {description} completed")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error during {description}:")
-        print(f"   Command: {command}")
-        print(f"   Error: {e.stderr}")
-        return False
+    print(f"❌ Error during {description}:")
+    print(f"   Command: {' '.join(shlex.quote(a) for a in argv)}")
+    print(f"   Error: {stderr[-4096:].decode(errors='replace')}")
+    return False
 
 
-def step1_change_tempo(input_file, output_file, tempo_factor):
+async def ensure_noise_bed(rain_file, vinyl_file, rain_volume, vinyl_volume,
+                           work_dir=None):
     """
-    STEP 1: Change Tempo (±2–3%)
-    Content ID is very sensitive to tempo.
+    Pre-mix rain and vinyl into a single cached noise-bed WAV.
+
+    In batch mode every file mixes the same rain+vinyl combination, so
+    render that mix once (volumes already applied, float to avoid a lossy
+    intermediate) and reuse the file. The cache key hashes the source
+    paths, their mtimes and the volumes into the filename, so any change
+    to the inputs invalidates it. The bed lives in the system temp
+    directory (not the music folder, where discovery would pick it up as
+    an input track).
+
+    Returns the bed path, or None when both noise files aren't available
+    (callers then fall back to per-file noise handling).
     """
-    if tempo_factor < 0.97 or tempo_factor > 1.03:
-        print(f"⚠️  Warning: Tempo factor {tempo_factor} is outside recommended range (0.97-1.03)")
-    
-    command = f'ffmpeg -i "{input_file}" -filter:a "atempo={tempo_factor}" -y "{output_file}"'
-    return run_ffmpeg(command, f"Changing tempo by {((tempo_factor-1)*100):.1f}%")
+    if not (rain_file and os.path.exists(rain_file)
+            and vinyl_file and os.path.exists(vinyl_file)):
+        return None
 
+    if work_dir is None:
+        work_dir = tempfile.gettempdir()
+    key = hashlib.sha1(repr((
+        os.path.abspath(rain_file), os.path.getmtime(rain_file),
+        os.path.abspath(vinyl_file), os.path.getmtime(vinyl_file),
+        rain_volume, vinyl_volume,
+    )).encode()).hexdigest()[:12]
+    bed_file = os.path.join(work_dir, f'.noise_bed_{key}.wav')
+    if os.path.exists(bed_file):
+        return bed_file
+
+    command = (['ffmpeg'] + _threads_args() +
+               ['-i', rain_file, '-i', vinyl_file,
+                '-filter_complex',
+                f'[0:a]volume={rain_volume}[r];[1:a]volume={vinyl_volume}[v];'
+                f'[r][v]amix=inputs=2:normalize=0[out]',
+                '-map', '[out]', '-vn', '-sn', '-dn',
+                '-c:a', 'pcm_f32le', '-y', bed_file])
+    if await run_ffmpeg_async(command, "Pre-mixing noise bed (rain + vinyl)"):
+        return bed_file
+    return None
 
-def step2_change_pitch(input_file, output_file, pitch_factor):
+
+def build_filter_graph(tempo_factor, pitch_factor, rain_file=None, vinyl_file=None,
+                       rain_volume=0.05, vinyl_volume=0.03, skip_eq=False,
+                       noise_bed=None, sample_rate=44100):
     """
-    STEP 2: Change Pitch (±1%)
-    Pitch change without altering tempo.
+    Build a single filter_complex graph covering STEPS 1-4:
+      STEP 1: Change Tempo (±2–3%) - Content ID is very sensitive to tempo.
+      STEP 2: Change Pitch (±1%) - without altering tempo further.
+      STEP 3: Add Rain / Vinyl Noise (CRITICAL) - destroys waveform matching.
+      STEP 4: Apply EQ - reduce harsh mids (2–5 kHz) + boost warmth.
+
+    Running all steps in one ffmpeg process avoids decoding and re-encoding
+    the full track once per step (and the intermediate WAVs on disk).
+
+    Returns (filter_graph, noise_inputs) where noise_inputs is the list of
+    extra input files (rain/vinyl) that must be passed as -i in order.
     """
+    if tempo_factor < 0.97 or tempo_factor > 1.03:
+        print(f"⚠️  Warning: Tempo factor {tempo_factor} is outside recommended range (0.97-1.03)")
     if pitch_factor < 0.99 or pitch_factor > 1.01:
         print(f"⚠️  Warning: Pitch factor {pitch_factor} is outside recommended range (0.99-1.01)")
-    
-    sample_rate = 44100
+
     new_rate = sample_rate * pitch_factor
-    command = f'ffmpeg -i "{input_file}" -filter:a "asetrate={new_rate},aresample={sample_rate}" -y "{output_file}"'
-    return run_ffmpeg(command, f"Changing pitch by {((pitch_factor-1)*100):.1f}%")
 
+    # STEPS 1+2: tempo then pitch on the main input, at its native rate
+    parts = [f'[0:a]atempo={tempo_factor},asetrate={new_rate},aresample={sample_rate}[m]']
+
+    # STEP 3: mix in the pre-rendered noise bed if we have one (volumes are
+    # already baked in), otherwise per-noise volume chains, one input each.
+    # Noise files are rendered at 44.1 kHz, so resample them to the input's
+    # rate for amix.
+    noise_inputs = []
+    if noise_bed:
+        noise_inputs.append(noise_bed)
+        parts.append(f'[1:a]aresample={sample_rate}[b]')
+        parts.append('[m][b]amix=inputs=2:normalize=0[mix]')
+        current = 'mix'
+    else:
+        noise_labels = []
+        for noise_file, volume, description in [(rain_file, rain_volume, 'Rain'),
+                                                (vinyl_file, vinyl_volume, 'Vinyl')]:
+            if noise_file and os.path.exists(noise_file):
+                index = len(noise_inputs) + 1
+                label = f'n{index}'
+                parts.append(f'[{index}:a]volume={volume},aresample={sample_rate}[{label}]')
+                noise_inputs.append(noise_file)
+                noise_labels.append(label)
+            elif noise_file:
+                print(f"⚠️  Warning: {description} file '{noise_file}' not found, skipping...")
+
+        if noise_labels:
+            mix_inputs = ''.join(f'[{label}]' for label in ['m'] + noise_labels)
+            parts.append(f'{mix_inputs}amix=inputs={len(noise_labels) + 1}:normalize=0[mix]')
+            current = 'mix'
+        else:
+            current = 'm'
+
+    # STEP 4: EQ (reduce mids, boost warmth)
+    if skip_eq:
+        print("⏭️  Skipping EQ step (not recommended)")
+        parts.append(f'[{current}]anull[out]')
+    else:
+        parts.append(f'[{current}]equalizer=f=3000:t=q:w=1:g=-3,equalizer=f=150:t=q:w=1:g=2[out]')
+
+    return ';'.join(parts), noise_inputs
 
-def step3_add_noise(input_file, output_file, rain_file=None, vinyl_file=None, rain_volume=0.05, vinyl_volume=0.03):
+
+def build_batch_filter_graph(count, tempo_factor, pitch_factor, rain_file=None,
+                             vinyl_file=None, rain_volume=0.05, vinyl_volume=0.03,
+                             skip_eq=False, noise_bed=None, sample_rates=None):
     """
-    STEP 3: Add Rain / Vinyl Noise (CRITICAL)
-    This destroys waveform matching.
+    Build one filter_complex graph that processes `count` input files at once.
+
+    Inputs 0..count-1 are the audio files; the rain/vinyl inputs follow and
+    are decoded once, then asplit so every file mixes against the same
+    streams. Each file gets its own [outK] label for -map. One ffmpeg
+    process handles the whole chunk, amortizing startup cost across files.
+
+    sample_rates gives each input's native rate (default: all 44100); the
+    pitch asetrate must use the real rate per file, while every chain ends
+    at 44.1 kHz so the shared noise split can feed all the mixes.
+
+    Returns (filter_graph, noise_inputs).
     """
-    current_file = input_file
-    
-    # Add rain if available
-    if rain_file and os.path.exists(rain_file):
-        rain_output = output_file.replace('.wav', '_rain.wav')
-        command = f'ffmpeg -i "{current_file}" -i "{rain_file}" -filter_complex "[1:a]volume={rain_volume}[a1];[0:a][a1]amix=inputs=2" -y "{rain_output}"'
-        if not run_ffmpeg(command, "Adding rain ambience"):
-            return False
-        current_file = rain_output
-    elif rain_file:
-        print(f"⚠️  Warning: Rain file '{rain_file}' not found, skipping...")
-    
-    # Add vinyl if available
-    if vinyl_file and os.path.exists(vinyl_file):
-        command = f'ffmpeg -i "{current_file}" -i "{vinyl_file}" -filter_complex "[1:a]volume={vinyl_volume}[a1];[0:a][a1]amix=inputs=2" -y "{output_file}"'
-        if not run_ffmpeg(command, "Adding vinyl texture"):
-            return False
-    elif vinyl_file:
-        print(f"⚠️  Warning: Vinyl file '{vinyl_file}' not found, skipping...")
-        # If vinyl is missing but we have rain output, rename it
-        if current_file != input_file:
-            os.rename(current_file, output_file)
+    if sample_rates is None:
+        sample_rates = [44100] * count
+
+    parts = []
+    noise_inputs = []
+    noise_labels_per_file = [[] for _ in range(count)]
+    if noise_bed:
+        # Pre-mixed bed (volumes baked in): decode once, asplit to all files
+        split_outputs = ''.join(f'[b_{k}]' for k in range(count))
+        parts.append(f'[{count}:a]asplit={count}{split_outputs}')
+        noise_inputs.append(noise_bed)
+        for k in range(count):
+            noise_labels_per_file[k].append(f'b_{k}')
     else:
-        # No noise files, just copy the input
-        if current_file != input_file:
-            os.rename(current_file, output_file)
+        for noise_file, volume, description in [(rain_file, rain_volume, 'Rain'),
+                                                (vinyl_file, vinyl_volume, 'Vinyl')]:
+            if noise_file and os.path.exists(noise_file):
+                index = count + len(noise_inputs)
+                prefix = f'n{len(noise_inputs)}'
+                split_outputs = ''.join(f'[{prefix}_{k}]' for k in range(count))
+                parts.append(f'[{index}:a]volume={volume},asplit={count}{split_outputs}')
+                noise_inputs.append(noise_file)
+                for k in range(count):
+                    noise_labels_per_file[k].append(f'{prefix}_{k}')
+            elif noise_file:
+                print(f"⚠️  Warning: {description} file '{noise_file}' not found, skipping...")
+
+    for k in range(count):
+        new_rate = sample_rates[k] * pitch_factor
+        parts.append(f'[{k}:a]atempo={tempo_factor},asetrate={new_rate},aresample=44100[m{k}]')
+        labels = [f'm{k}'] + noise_labels_per_file[k]
+        if len(labels) > 1:
+            mix_inputs = ''.join(f'[{label}]' for label in labels)
+            parts.append(f'{mix_inputs}amix=inputs={len(labels)}:normalize=0[x{k}]')
+            current = f'x{k}'
         else:
-            command = f'ffmpeg -i "{input_file}" -y "{output_file}"'
-            if not run_ffmpeg(command, "Copying file (no noise files provided)"):
-                return False
-    
-    return True
+            current = f'm{k}'
+        if skip_eq:
+            parts.append(f'[{current}]anull[out{k}]')
+        else:
+            parts.append(f'[{current}]equalizer=f=3000:t=q:w=1:g=-3,equalizer=f=150:t=q:w=1:g=2[out{k}]')
+
+    return ';'.join(parts), noise_inputs
+
+
+async def process_file_batch(pairs, tempo, pitch, rain_file, vinyl_file,
+                             rain_volume, vinyl_volume, skip_eq, noise_bed=None):
+    """
+    Process a chunk of (input_file, output_file) pairs in ONE ffmpeg run.
+
+    Falls back to per-file processing if the fused command fails (e.g. the
+    filter graph grew too large or one input is unreadable), so a single
+    bad file cannot sink the whole chunk. Returns the number of successes.
+    """
+    if len(pairs) > 1:
+        sample_rates = [await probe_sample_rate(input_file)
+                        for input_file, _ in pairs]
+        filter_graph, noise_inputs = build_batch_filter_graph(
+            len(pairs), tempo, pitch, rain_file, vinyl_file,
+            rain_volume, vinyl_volume, skip_eq, noise_bed, sample_rates)
+
+        command = ['ffmpeg'] + _threads_args() + ['-y']
+        for input_file, _ in pairs:
+            command += ['-i', input_file]
+        for noise_file in noise_inputs:
+            command += ['-i', noise_file]
+        command += ['-filter_complex', filter_graph]
+        for k, (_, output_file) in enumerate(pairs):
+            # Batch graphs stay at 44.1 kHz so the shared noise split can
+            # feed every file's amix
+            command += ['-map', f'[out{k}]'] + _pcm_output_args() + [output_file]
+
+        if await run_ffmpeg_async(command, f"Processing {len(pairs)} files (single ffmpeg pass)"):
+            return len(pairs)
+        print("⚠️  Batched pass failed, retrying files individually...")
+
+    success_count = 0
+    for input_file, output_file in pairs:
+        success, _ = await process_single_file(
+            input_file, output_file, tempo, pitch, rain_file, vinyl_file,
+            rain_volume, vinyl_volume, None, True, skip_eq, False,
+            Path(input_file).stem, str(Path(output_file).parent),
+            noise_bed=noise_bed)
+        if success:
+            success_count += 1
+    return success_count
+
 
+def _peaking_biquad(freq, q, gain_db, sample_rate):
+    """Second-order peaking-EQ section (RBJ cookbook), in sos layout.
 
-def step4_apply_eq(input_file, output_file):
+    Matches ffmpeg's equalizer filter with t=q semantics.
     """
-    STEP 4: Apply EQ (very important)
-    Reduce harsh mids (2–5 kHz) + boost warmth.
+    amp = 10 ** (gain_db / 40)
+    w0 = 2 * np.pi * freq / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    a0 = 1 + alpha / amp
+    return np.array([[(1 + alpha * amp) / a0, -2 * cos_w0 / a0, (1 - alpha * amp) / a0,
+                      1.0, -2 * cos_w0 / a0, (1 - alpha / amp) / a0]])
+
+
+def _process_numpy(input_file, output_file, pitch_factor, noise_files, skip_eq):
+    """In-process STEPS 2-4 for WAV input: pitch shift, noise mix, EQ.
+
+    Reads the whole file as float32 once and stays in float until the
+    final PCM_16 write, so there are no repeated int<->float conversions
+    between stages. noise_files is a list of (path, volume) pairs (a
+    pre-mixed bed is passed at volume 1.0). Raises ValueError for inputs
+    the ffmpeg path must handle (unexpected sample rates, channel
+    mismatches).
     """
-    command = f'ffmpeg -i "{input_file}" -filter:a "equalizer=f=3000:t=q:w=1:g=-3,equalizer=f=150:t=q:w=1:g=2" -y "{output_file}"'
-    return run_ffmpeg(command, "Applying EQ (reducing mids, boosting warmth)")
+    data, sample_rate = sf.read(input_file, dtype='float32', always_2d=True)
+    if sample_rate != 44100:
+        raise ValueError(f'unexpected sample rate {sample_rate}')
+
+    # Pitch: same speed-change trick as asetrate+aresample, as a polyphase
+    # resample at the original rate
+    if pitch_factor != 1.0:
+        ratio = Fraction(1 / pitch_factor).limit_denominator(1000)
+        data = sps.resample_poly(
+            data, ratio.numerator, ratio.denominator, axis=0).astype(np.float32)
+
+    # Noise mix (amix semantics: plain sum, output runs to the longest input)
+    for noise_file, volume in noise_files:
+        noise, noise_rate = sf.read(noise_file, dtype='float32', always_2d=True)
+        if noise_rate != sample_rate:
+            raise ValueError(f'noise sample rate {noise_rate} != {sample_rate}')
+        if noise.shape[1] != data.shape[1]:
+            if noise.shape[1] == 1:
+                noise = np.repeat(noise, data.shape[1], axis=1)
+            else:
+                raise ValueError('channel layout mismatch with noise file')
+        if len(noise) > len(data):
+            data = np.pad(data, ((0, len(noise) - len(data)), (0, 0)))
+        overlap = min(len(data), len(noise))
+        data[:overlap] += noise[:overlap] * volume
+
+    if not skip_eq:
+        sos = np.vstack([_peaking_biquad(3000, 1.0, -3.0, sample_rate),
+                         _peaking_biquad(150, 1.0, 2.0, sample_rate)])
+        data = sps.sosfilt(sos, data, axis=0).astype(np.float32)
+
+    sf.write(output_file, data, sample_rate, subtype='PCM_16')
+
+
+class LoopTooLargeError(ValueError):
+    """Looped output would overflow the 32-bit WAV size fields."""
+
+
+def _loop_wav_sendfile(input_file, output_file, loop_count):
+    """Concatenate a WAV's data chunk loop_count extra times via os.sendfile.
+
+    Writes the source header chunks with patched RIFF/data sizes, then asks
+    the kernel to copy the raw sample bytes straight from the source file
+    -- a zero-copy transfer with no decode and no userspace buffering.
+    Raises ValueError/OSError when the file isn't plain RIFF/WAVE or
+    sendfile isn't supported for file-to-file copies on this platform, and
+    LoopTooLargeError when the result would overflow the 32-bit WAV size
+    fields (no fallback can fix that).
+    """
+    with open(input_file, 'rb') as src:
+        riff = src.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            raise ValueError('not a RIFF/WAVE file')
+
+        # Collect every chunk up to 'data' verbatim (fmt etc.)
+        pre_data_chunks = b''
+        while True:
+            chunk_header = src.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError("no 'data' chunk found")
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+            if chunk_id == b'data':
+                data_offset = src.tell()
+                data_size = chunk_size
+                break
+            pre_data_chunks += chunk_header + src.read(chunk_size + (chunk_size & 1))
+
+        total_data = data_size * (loop_count + 1)
+        riff_size = 4 + len(pre_data_chunks) + 8 + total_data
+        if riff_size > 0xFFFFFFFF:
+            raise LoopTooLargeError('looped output too large for a WAV container')
+
+        with open(output_file, 'wb') as dst:
+            dst.write(b'RIFF' + struct.pack('<I', riff_size) + b'WAVE')
+            dst.write(pre_data_chunks)
+            dst.write(b'data' + struct.pack('<I', total_data))
+            dst.flush()
+            in_fd = src.fileno()
+            out_fd = dst.fileno()
+            for _ in range(loop_count + 1):
+                offset = data_offset
+                remaining = data_size
+                while remaining:
+                    sent = os.sendfile(out_fd, in_fd, offset, remaining)
+                    if sent == 0:
+                        raise OSError('sendfile copied 0 bytes')
+                    offset += sent
+                    remaining -= sent
 
 
 def step5_create_loop(input_file, output_file, loop_count=20, use_crossfade=True):
     """
     STEP 5: Loop for LONG videos (safe way)
-    Create looped version with optional crossfade.
-    Note: acrossfade with stream_loop doesn't work well, so we use stream_loop with copy for simplicity.
+    Create looped version by replicating the PCM data with plain file I/O.
+
+    The fused pass always writes PCM WAV, so looping needs no decode at
+    all: write one header and append the sample data loop_count extra
+    times (same semantics as ffmpeg's -stream_loop N), streaming in ~1 MiB
+    blocks to bound memory. Crossfade is still not supported; for smooth
+    looping the user can use external tools.
     """
-    # stream_loop with crossfade is complex, so we use the simpler copy method
-    # For smooth looping, the user can use external tools or we can implement a more complex solution later
-    command = f'ffmpeg -stream_loop {loop_count} -i "{input_file}" -c copy -y "{output_file}"'
-    return run_ffmpeg(command, f"Creating looped version ({loop_count} loops)")
-
-
-def cleanup_intermediate_files(keep_intermediate, intermediate_files):
-    """Clean up intermediate files unless keep_intermediate is True."""
-    if not keep_intermediate:
-        print("🧹 Cleaning up intermediate files...")
-        for file in intermediate_files:
-            if os.path.exists(file):
-                try:
-                    os.remove(file)
-                    print(f"   Removed: {file}")
-                except Exception as e:
-                    print(f"   Warning: Could not remove {file}: {e}")
-    else:
-        print("📁 Keeping intermediate files as requested")
+    print(f"🔄 Creating looped version ({loop_count} loops)...")
+
+    # Fast path: replicate the data chunk kernel-side with os.sendfile, so
+    # the samples never enter userspace at all.
+    if hasattr(os, 'sendfile'):
+        try:
+            _loop_wav_sendfile(input_file, output_file, loop_count)
+            print(f"✅ Creating looped version ({loop_count} loops) completed")
+            return True
+        except LoopTooLargeError as e:
+            # The buffered copy hits the same 32-bit limit; don't retry
+            print(f"❌ Error during Creating looped version:")
+            print(f"   Error: {e} (reduce --loop)")
+            return False
+        except (OSError, ValueError) as e:
+            print(f"⚠️  sendfile loop unavailable ({e}), using buffered copy...")
+
+    try:
+        with wave.open(input_file, 'rb') as src:
+            params = src.getparams()
+            frame_size = max(1, params.sampwidth * params.nchannels)
+            # WAV sizes are 32-bit; refuse up front rather than crashing in
+            # wave's header patch after gigabytes have already been written
+            if params.nframes * (loop_count + 1) * frame_size + 44 > 0xFFFFFFFF:
+                print(f"❌ Error during Creating looped version:")
+                print(f"   Error: looped output too large for a WAV container (reduce --loop)")
+                return False
+            with wave.open(output_file, 'wb') as dst:
+                dst.setparams(params)
+                block_frames = max(1, (1 << 20) // frame_size)
+                for _ in range(loop_count + 1):
+                    src.rewind()
+                    while True:
+                        block = src.readframes(block_frames)
+                        if not block:
+                            break
+                        dst.writeframesraw(block)
+        print(f"✅ Creating looped version ({loop_count} loops) completed")
+        return True
+    except (wave.Error, struct.error, OSError) as e:
+        print(f"❌ Error during Creating looped version:")
+        print(f"   Error: {e}")
+        return False
 
 
-def process_single_file(input_file, output_file, tempo, pitch, rain_file, vinyl_file, 
-                       rain_volume, vinyl_volume, loop_count, use_crossfade, 
-                       skip_eq, keep_intermediate, base_name=None, work_dir=None):
+async def process_single_file(input_file, output_file, tempo, pitch, rain_file, vinyl_file,
+                              rain_volume, vinyl_volume, loop_count, use_crossfade,
+                              skip_eq, keep_intermediate, base_name=None, work_dir=None,
+                              noise_bed=None):
     """
     Process a single audio file through all steps.
     Returns (success, final_output_file)
@@ -169,60 +534,74 @@ def process_single_file(input_file, output_file, tempo, pitch, rain_file, vinyl_
     
     print(f"\n🎵 Processing: {input_file}")
     print("=" * 60)
-    
-    # Track intermediate files for cleanup (use base_name to avoid conflicts)
-    intermediate_files = []
-    
-    # STEP 1: Change Tempo
-    tempo_file = str(work_dir / f'{base_name}_tempo.wav')
-    if not step1_change_tempo(input_file, tempo_file, tempo):
-        return False, None
-    intermediate_files.append(tempo_file)
-    
-    # STEP 2: Change Pitch
-    pitch_file = str(work_dir / f'{base_name}_pitch.wav')
-    if not step2_change_pitch(tempo_file, pitch_file, pitch):
-        return False, None
-    intermediate_files.append(pitch_file)
-    
-    # STEP 3: Add Noise
-    textured_file = str(work_dir / f'{base_name}_textured.wav')
-    if not step3_add_noise(pitch_file, textured_file, rain_file, vinyl_file, 
-                           rain_volume, vinyl_volume):
-        return False, None
-    intermediate_files.append(textured_file)
-    
-    # STEP 4: Apply EQ
-    if skip_eq:
-        print("⏭️  Skipping EQ step (not recommended)")
-        final_file = textured_file
-    else:
+
+    # Write straight to the requested output; a separate _final.wav is only
+    # needed when it has to serve as seekable input for the loop pass.
+    if loop_count:
         final_file = str(work_dir / f'{base_name}_final.wav')
-        if not step4_apply_eq(textured_file, final_file):
+    else:
+        final_file = output_file
+
+    # STEPS 1-4. For WAV input with no tempo change (atempo needs ffmpeg's
+    # time-stretcher) the whole chain can run in-process via numpy/scipy.
+    processed = False
+    if HAVE_NUMPY_PATH and tempo == 1.0 and input_file.lower().endswith('.wav'):
+        noise_files = []
+        if noise_bed:
+            noise_files.append((noise_bed, 1.0))
+        else:
+            for noise_file, volume, description in [(rain_file, rain_volume, 'Rain'),
+                                                    (vinyl_file, vinyl_volume, 'Vinyl')]:
+                if noise_file and os.path.exists(noise_file):
+                    noise_files.append((noise_file, volume))
+                elif noise_file:
+                    print(f"⚠️  Warning: {description} file '{noise_file}' not found, skipping...")
+        print("🔄 Applying pitch, noise and EQ (in-process fast path)...")
+        try:
+            _process_numpy(input_file, final_file, pitch, noise_files, skip_eq)
+            print("✅ Applying pitch, noise and EQ (in-process fast path) completed")
+            processed = True
+        except (ValueError, OSError) as e:
+            print(f"⚠️  Fast path unavailable ({e}), using ffmpeg...")
+
+    if not processed:
+        # Tempo, pitch, noise and EQ fused into one ffmpeg pass, running at
+        # the input's native sample rate
+        sample_rate = await probe_sample_rate(input_file)
+        filter_graph, noise_inputs = build_filter_graph(
+            tempo, pitch, rain_file, vinyl_file, rain_volume, vinyl_volume, skip_eq,
+            noise_bed, sample_rate)
+
+        command = ['ffmpeg'] + _threads_args()
+        for f in [input_file] + noise_inputs:
+            command += ['-i', f]
+        command += (['-filter_complex', filter_graph, '-map', '[out]'] +
+                    _pcm_output_args(sample_rate) + ['-y', final_file])
+        if not await run_ffmpeg_async(command, "Applying tempo, pitch, noise and EQ (single pass)"):
             return False, None
-        intermediate_files.append(final_file)
-    
+
     # STEP 5: Create Loop (optional)
+    # -stream_loop re-reads its input N times, so the loop pass needs a real
+    # (seekable) file and cannot consume the fused pass through a pipe.
     if loop_count:
         looped_file = output_file
         if not step5_create_loop(final_file, looped_file, loop_count, use_crossfade):
             return False, None
         final_output = looped_file
+        if keep_intermediate:
+            print(f"📁 Keeping intermediate file: {final_file}")
+        else:
+            try:
+                os.remove(final_file)
+            except OSError as e:
+                print(f"   Warning: Could not remove {final_file}: {e}")
     else:
-        # No loop, rename final to output
-        if final_file != output_file:
-            os.rename(final_file, output_file)
         final_output = output_file
-        if final_file in intermediate_files:
-            intermediate_files.remove(final_file)
-    
+
     print("\n" + "=" * 60)
     print(f"✅ Processing complete!")
     print(f"📁 Output file: {final_output}")
-    
-    # Cleanup
-    cleanup_intermediate_files(keep_intermediate, intermediate_files)
-    
+
     return True, final_output
 
 
@@ -254,6 +633,9 @@ Examples:
                        help='Output file name (default: auto-generated)')
     parser.add_argument('--music-folder', action='store_true',
                        help='Process all audio files in the music/ folder with default settings')
+    parser.add_argument('--jobs', type=int, default=min(os.cpu_count() or 1, 8),
+                       help='Number of files to process in parallel with --music-folder '
+                            '(default: min(cpu_count, 8))')
     parser.add_argument('--tempo', type=float, default=0.975,
                        help='Tempo factor (0.97-1.03, default: 0.975 = -2.5%%)')
     parser.add_argument('--pitch', type=float, default=0.99,
@@ -292,13 +674,16 @@ Examples:
             print(f"❌ Music folder '{music_dir}' not found")
             sys.exit(1)
         
-        # Find all audio files
-        audio_extensions = ['*.mp3', '*.wav', '*.flac', '*.m4a', '*.aac', '*.ogg']
-        audio_files = []
-        for ext in audio_extensions:
-            audio_files.extend(music_dir.glob(ext))
-            audio_files.extend(music_dir.glob(ext.upper()))
-        
+        # Find all audio files in one directory scan (case-insensitive on
+        # extension), instead of one glob walk per extension and case.
+        audio_extensions = {'.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg'}
+        # Dot-prefixed names are skipped: hidden files aren't input tracks
+        # (and stale noise-bed caches from older versions lived there).
+        audio_files = [Path(entry.path) for entry in os.scandir(music_dir)
+                       if entry.is_file()
+                       and not entry.name.startswith('.')
+                       and Path(entry.name).suffix.lower() in audio_extensions]
+
         if not audio_files:
             print(f"❌ No audio files found in '{music_dir}'")
             sys.exit(1)
@@ -306,30 +691,80 @@ Examples:
         print(f"\n📁 Found {len(audio_files)} audio file(s) in music folder")
         print("=" * 60)
         
-        success_count = 0
-        for audio_file in sorted(audio_files):
-            base_name = audio_file.stem
-            output_file = music_dir / f'{base_name}_processed.wav'
-            
-            success, _ = process_single_file(
-                str(audio_file),
-                str(output_file),
-                args.tempo,
-                args.pitch,
-                args.rain,
-                args.vinyl,
-                args.rain_volume,
-                args.vinyl_volume,
-                args.loop,
-                not args.no_crossfade,
-                args.skip_eq,
-                args.keep_intermediate,
-                base_name,
-                str(music_dir)  # Use music folder for intermediate files
-            )
-            
-            if success:
-                success_count += 1
+        # Each file is an independent ffmpeg pipeline, so run them in
+        # parallel with one ffmpeg thread each rather than sequentially.
+        jobs = max(1, args.jobs)
+        print(f"⚙️  Running up to {jobs} file(s) in parallel")
+        if jobs > 1 and len(audio_files) > 1:
+            # Only pin ffmpeg's thread pools when more than one process
+            # will actually run concurrently
+            global FFMPEG_THREADS
+            FFMPEG_THREADS = 1
+
+        async def run_batch():
+            # Render the rain+vinyl mix once for the whole batch instead of
+            # re-mixing the same two files into every track.
+            noise_bed = await ensure_noise_bed(args.rain, args.vinyl,
+                                               args.rain_volume,
+                                               args.vinyl_volume)
+
+            # Bound concurrent ffmpeg processes; the event loop just
+            # supervises them, so no worker processes are needed.
+            semaphore = asyncio.Semaphore(jobs)
+
+            async def bounded(coro):
+                async with semaphore:
+                    return await coro
+
+            tasks = []
+            if args.loop:
+                # Looping needs a second per-file ffmpeg pass, so keep
+                # one-file-per-task submissions.
+                for audio_file in sorted(audio_files):
+                    base_name = audio_file.stem
+                    output_file = music_dir / f'{base_name}_processed.wav'
+                    tasks.append(bounded(process_single_file(
+                        str(audio_file),
+                        str(output_file),
+                        args.tempo,
+                        args.pitch,
+                        args.rain,
+                        args.vinyl,
+                        args.rain_volume,
+                        args.vinyl_volume,
+                        args.loop,
+                        not args.no_crossfade,
+                        args.skip_eq,
+                        args.keep_intermediate,
+                        base_name,
+                        str(music_dir),  # Use music folder for intermediate files
+                        noise_bed
+                    )))
+                results = await asyncio.gather(*tasks)
+                return sum(1 for success, _ in results if success)
+
+            # Fuse chunks of files into one ffmpeg process each so
+            # startup cost is amortized across the chunk — but never into
+            # fewer chunks than there are job slots, or the file-level
+            # parallelism (with its pinned single-thread ffmpegs) is lost.
+            pairs = [(str(f), str(music_dir / f'{f.stem}_processed.wav'))
+                     for f in sorted(audio_files)]
+            chunk_size = min(BATCH_FUSE_SIZE, max(1, len(pairs) // jobs))
+            for i in range(0, len(pairs), chunk_size):
+                tasks.append(bounded(process_file_batch(
+                    pairs[i:i + chunk_size],
+                    args.tempo,
+                    args.pitch,
+                    args.rain,
+                    args.vinyl,
+                    args.rain_volume,
+                    args.vinyl_volume,
+                    args.skip_eq,
+                    noise_bed
+                )))
+            return sum(await asyncio.gather(*tasks))
+
+        success_count = asyncio.run(run_batch())
         
         print("\n" + "=" * 60)
         print(f"✅ Batch processing complete! {success_count}/{len(audio_files)} files processed successfully")
@@ -351,7 +786,7 @@ Examples:
         args.output = f'{base_name}_processed.wav'
     
     base_name = Path(args.input).stem
-    success, final_output = process_single_file(
+    success, final_output = asyncio.run(process_single_file(
         args.input,
         args.output,
         args.tempo,
@@ -366,8 +801,8 @@ Examples:
         args.keep_intermediate,
         base_name,
         None  # Use default work_dir (same as input file)
-    )
-    
+    ))
+
     if not success:
         sys.exit(1)
     